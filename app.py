@@ -1,9 +1,6 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import joblib
 import pickle
 import os
@@ -27,6 +24,24 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Bounded so a long-running server does not keep an explainer (and its
+# background data) alive for every model/dataset pair ever uploaded
+@st.cache_resource(show_spinner=False, max_entries=8, ttl=3600)
+def build_explainer_manager(_model, _data, model_hash, data_hash):
+    """
+    Build an ExplainerManager once per uploaded model/dataset pair
+    
+    Args:
+        _model: Trained ML model (not hashed)
+        _data: Processed feature DataFrame (not hashed)
+        model_hash: Hash of the uploaded model bytes
+        data_hash: Hash of the uploaded data bytes and target selection
+        
+    Returns:
+        ExplainerManager instance shared across reruns and sessions
+    """
+    return ExplainerManager(_model, _data)
+
 def main():
     """Main application function"""
     st.title("🔍 Model Interpretation Dashboard")
@@ -43,6 +58,12 @@ def main():
         st.session_state.predictions = None
     if 'selected_instance' not in st.session_state:
         st.session_state.selected_instance = None
+    if 'model_hash' not in st.session_state:
+        st.session_state.model_hash = None
+    if 'model_caps' not in st.session_state:
+        st.session_state.model_caps = None
+    if 'data_hash' not in st.session_state:
+        st.session_state.data_hash = None
     
     # Sidebar for uploads and configuration
     with st.sidebar:
@@ -57,11 +78,24 @@ def main():
             # Initialize explainer if not already done
             if st.session_state.explainer_manager is None:
                 with st.spinner("Initializing explainers..."):
-                    st.session_state.explainer_manager = ExplainerManager(
-                        st.session_state.model, 
-                        st.session_state.data
+                    st.session_state.explainer_manager = build_explainer_manager(
+                        st.session_state.model,
+                        st.session_state.data,
+                        st.session_state.model_hash,
+                        st.session_state.data_hash
                     )
                 st.success("Explainers initialized!")
+            
+            # LIME sampling budget used by the explanation tabs
+            st.slider(
+                "LIME perturbations",
+                min_value=200,
+                max_value=5000,
+                value=1000,
+                step=100,
+                key="lime_num_samples",
+                help="Fewer samples are faster but less stable; raise this if LIME explanations vary between runs"
+            )
     
     # Main content area
     if st.session_state.model is not None and st.session_state.data is not None:
@@ -96,7 +130,7 @@ def main():
         
         To get started:
         1. **Upload a trained ML model** (sklearn, XGBoost) in the sidebar
-        2. **Upload a dataset** (.csv) for analysis
+        2. **Upload a dataset** (.csv or .parquet) for analysis
         3. **Explore predictions** and explanations across different tabs
         
         ### Features:
@@ -106,8 +140,8 @@ def main():
         - 🔄 **What-If Analysis**: Modify features and see prediction changes
         
         ### Supported:
-        - **Models**: scikit-learn, XGBoost (pickled/joblib format)
-        - **Data**: CSV files with numerical and categorical features
+        - **Models**: scikit-learn, XGBoost (pickled/joblib format), and ONNX (.onnx, requires onnxruntime)
+        - **Data**: CSV or Parquet files with numerical and categorical features
         - **Explanations**: SHAP and LIME
         """)
 
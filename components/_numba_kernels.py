@@ -0,0 +1,21 @@
+import numpy as np
+from numba import njit
+
+@njit(cache=True, fastmath=True)
+def apply_noise(values, sigma, seed):
+    """
+    Multiply each value by (1 + N(0, sigma)) in a single fused pass
+    
+    Args:
+        values: 1-D float64 array of feature values
+        sigma: Standard deviation of the relative noise
+        seed: Seed for numba's random generator
+    
+    Returns:
+        New array with the noisy values
+    """
+    np.random.seed(seed)
+    out = np.empty_like(values)
+    for i in range(values.size):
+        out[i] = values[i] * (1.0 + np.random.normal() * sigma)
+    return out
@@ -1,8 +1,15 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from utils.data_processor import DataProcessor
+
+def _run_in_script_context(ctx, func, *args, **kwargs):
+    """Run func in a worker thread attached to the current script run so st.* calls still render"""
+    add_script_run_ctx(threading.current_thread(), ctx)
+    return func(*args, **kwargs)
 
 def render_explanation_panel(explanation_type):
     """
@@ -31,7 +38,7 @@ def render_explanation_panel(explanation_type):
                         st.dataframe(importance_df, use_container_width=True)
                         
                         # Download importance data
-                        csv = importance_df.to_csv(index=False)
+                        csv = DataProcessor.to_csv_bytes(importance_df)
                         st.download_button(
                             label="📥 Download Importance Data",
                             data=csv,
@@ -67,8 +74,8 @@ def render_explanation_panel(explanation_type):
             if st.button("📋 Show Instance Details", key="show_instance"):
                 st.subheader("Instance Information")
                 
-                # Show original data
-                instance_data = st.session_state.raw_data.iloc[instance_idx]
+                # Show original data as a one-row frame (no Series transpose needed)
+                instance_data = st.session_state.raw_data.iloc[[instance_idx]]
                 prediction = st.session_state.predictions[instance_idx] if st.session_state.predictions is not None else "N/A"
                 
                 st.write("**Prediction:**", prediction)
@@ -77,14 +84,14 @@ def render_explanation_panel(explanation_type):
                 if hasattr(st.session_state, 'pred_probabilities') and st.session_state.pred_probabilities is not None:
                     probs = st.session_state.pred_probabilities[instance_idx]
                     prob_df = pd.DataFrame({
-                        'Class': [f'Class_{i}' for i in range(len(probs))],
+                        'Class': np.char.add('Class_', np.arange(len(probs)).astype(str)),
                         'Probability': probs
                     })
                     st.write("**Prediction Probabilities:**")
                     st.dataframe(prob_df, use_container_width=True)
                 
                 st.write("**Feature Values:**")
-                st.dataframe(pd.DataFrame(instance_data).T, use_container_width=True)
+                st.dataframe(instance_data, use_container_width=True)
         
         with col1:
             # Explanation method selection
@@ -103,7 +110,10 @@ def render_explanation_panel(explanation_type):
                     if explanation_method == "SHAP":
                         explanation_data = st.session_state.explainer_manager.get_shap_local_explanation(instance_idx)
                     else:  # LIME
-                        explanation_data = st.session_state.explainer_manager.get_lime_local_explanation(instance_idx)
+                        explanation_data = st.session_state.explainer_manager.get_lime_local_explanation(
+                            instance_idx,
+                            num_samples=st.session_state.get('lime_num_samples', 1000)
+                        )
                     
                     if explanation_data is not None:
                         # Create and display plot
@@ -134,7 +144,7 @@ def render_explanation_panel(explanation_type):
                             st.dataframe(exp_df, use_container_width=True)
                             
                             # Download explanation data
-                            csv = exp_df.to_csv(index=False)
+                            csv = DataProcessor.to_csv_bytes(exp_df)
                             st.download_button(
                                 label=f"📥 Download {explanation_method} Explanation",
                                 data=csv,
@@ -154,22 +164,37 @@ def render_explanation_panel(explanation_type):
         st.markdown("Generate both SHAP and LIME explanations to compare different perspectives")
         
         if st.button("⚡ Generate Both SHAP & LIME", key="compare_explanations"):
+            explainer_manager = st.session_state.explainer_manager
+            ctx = get_script_run_ctx()
+            
+            # SHAP and LIME are independent and spend most of their time in
+            # native code, so compute them concurrently
+            with st.spinner("Calculating SHAP and LIME..."):
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    shap_future = executor.submit(
+                        _run_in_script_context, ctx,
+                        explainer_manager.get_shap_local_explanation, instance_idx
+                    )
+                    lime_future = executor.submit(
+                        _run_in_script_context, ctx,
+                        explainer_manager.get_lime_local_explanation, instance_idx,
+                        num_samples=st.session_state.get('lime_num_samples', 1000)
+                    )
+                    shap_data = shap_future.result()
+                    lime_data = lime_future.result()
+            
             col1, col2 = st.columns(2)
             
             with col1:
                 st.markdown("**SHAP Explanation**")
-                with st.spinner("Calculating SHAP..."):
-                    shap_data = st.session_state.explainer_manager.get_shap_local_explanation(instance_idx)
-                    if shap_data:
-                        shap_fig = st.session_state.explainer_manager.create_local_explanation_plot(shap_data, "SHAP")
-                        if shap_fig:
-                            st.plotly_chart(shap_fig, use_container_width=True)
+                if shap_data:
+                    shap_fig = explainer_manager.create_local_explanation_plot(shap_data, "SHAP")
+                    if shap_fig:
+                        st.plotly_chart(shap_fig, use_container_width=True)
             
             with col2:
                 st.markdown("**LIME Explanation**")
-                with st.spinner("Calculating LIME..."):
-                    lime_data = st.session_state.explainer_manager.get_lime_local_explanation(instance_idx)
-                    if lime_data:
-                        lime_fig = st.session_state.explainer_manager.create_local_explanation_plot(lime_data, "LIME")
-                        if lime_fig:
-                            st.plotly_chart(lime_fig, use_container_width=True)
\ No newline at end of file
+                if lime_data:
+                    lime_fig = explainer_manager.create_local_explanation_plot(lime_data, "LIME")
+                    if lime_fig:
+                        st.plotly_chart(lime_fig, use_container_width=True)
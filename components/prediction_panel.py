@@ -1,8 +1,59 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
+from utils.data_processor import DataProcessor
+from utils.model_loader import ModelLoader
+
+def compute_prediction_stats(predictions):
+    """
+    Compute summary statistics for the prediction panel in one place
+    
+    Args:
+        predictions: Array of model predictions
+        
+    Returns:
+        Dictionary with the statistics shown in the panel
+    """
+    preds = np.asarray(predictions)
+    stats = {
+        'count': len(preds),
+        'is_numeric': np.issubdtype(preds.dtype, np.number)
+    }
+    
+    if stats['is_numeric']:
+        min_pred, max_pred = preds.min(), preds.max()
+        stats['mean'] = preds.mean()
+        stats['std'] = preds.std()
+        stats['range'] = max_pred - min_pred
+    else:
+        # Count classes once and reuse for metrics and the distribution plot
+        classes, counts = np.unique(preds, return_counts=True)
+        order = np.argsort(-counts, kind='stable')
+        stats['value_counts'] = pd.Series(counts[order], index=classes[order])
+    
+    return stats
+
+def build_display_df(raw_data, predictions, pred_probabilities=None):
+    """
+    Build the predictions table shown and exported by the panel
+    
+    Args:
+        raw_data: Original uploaded DataFrame
+        predictions: Array of model predictions
+        pred_probabilities: Optional array of class probabilities
+        
+    Returns:
+        DataFrame with prediction (and probability) columns appended
+    """
+    # Build the added columns separately so the raw data is not copied first
+    frames = [raw_data, pd.DataFrame({'Prediction': predictions}, index=raw_data.index)]
+    
+    # Add probability columns if available
+    if pred_probabilities is not None:
+        prob_columns = np.char.add('Prob_Class_', np.arange(pred_probabilities.shape[1]).astype(str))
+        frames.append(pd.DataFrame(pred_probabilities, columns=prob_columns, index=raw_data.index))
+    
+    return pd.concat(frames, axis=1)
 
 def render_prediction_panel():
     """Render the predictions panel"""
@@ -15,54 +66,70 @@ def render_prediction_panel():
     # Generate predictions if not already done
     if st.session_state.predictions is None:
         with st.spinner("Generating predictions..."):
+            model = st.session_state.model
+            caps = st.session_state.get('model_caps') or ModelLoader.get_model_capabilities(model)
             try:
-                predictions = st.session_state.model.predict(st.session_state.data)
+                predictions = model.predict(st.session_state.data)
                 st.session_state.predictions = predictions
+                st.session_state.prediction_stats = compute_prediction_stats(predictions)
                 
-                # Try to get prediction probabilities for classification
-                if hasattr(st.session_state.model, 'predict_proba'):
+                # Get prediction probabilities for classification
+                st.session_state.pred_probabilities = None
+                if caps['proba']:
                     try:
-                        pred_proba = st.session_state.model.predict_proba(st.session_state.data)
-                        st.session_state.pred_probabilities = pred_proba
-                    except:
-                        st.session_state.pred_probabilities = None
+                        st.session_state.pred_probabilities = model.predict_proba(st.session_state.data)
+                    except Exception as e:
+                        st.warning(f"Could not compute prediction probabilities: {str(e)}")
+                
+                st.session_state.predictions_table = build_display_df(
+                    st.session_state.raw_data,
+                    predictions,
+                    st.session_state.pred_probabilities
+                )
                 
             except Exception as e:
                 st.error(f"Error generating predictions: {str(e)}")
                 return
     
+    # Statistics are computed once per set of predictions, not on every rerun
+    if st.session_state.get('prediction_stats') is None:
+        st.session_state.prediction_stats = compute_prediction_stats(st.session_state.predictions)
+    stats = st.session_state.prediction_stats
+    
     # Display prediction statistics
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Total Predictions", len(st.session_state.predictions))
+        st.metric("Total Predictions", stats['count'])
     
     with col2:
-        if np.issubdtype(st.session_state.predictions.dtype, np.number):
-            st.metric("Mean Prediction", f"{np.mean(st.session_state.predictions):.3f}")
+        if stats['is_numeric']:
+            st.metric("Mean Prediction", f"{stats['mean']:.3f}")
         else:
-            unique_preds = np.unique(st.session_state.predictions)
-            st.metric("Unique Classes", len(unique_preds))
+            st.metric("Unique Classes", len(stats['value_counts']))
     
     with col3:
-        if np.issubdtype(st.session_state.predictions.dtype, np.number):
-            st.metric("Std Prediction", f"{np.std(st.session_state.predictions):.3f}")
+        if stats['is_numeric']:
+            st.metric("Std Prediction", f"{stats['std']:.3f}")
         else:
-            most_common = pd.Series(st.session_state.predictions).value_counts().index[0]
+            most_common = stats['value_counts'].index[0]
             st.metric("Most Common", str(most_common))
     
     with col4:
-        if np.issubdtype(st.session_state.predictions.dtype, np.number):
-            st.metric("Prediction Range", f"{np.ptp(st.session_state.predictions):.3f}")
+        if stats['is_numeric']:
+            st.metric("Prediction Range", f"{stats['range']:.3f}")
         else:
-            least_common = pd.Series(st.session_state.predictions).value_counts().index[-1]
+            least_common = stats['value_counts'].index[-1]
             st.metric("Least Common", str(least_common))
     
     # Visualization section
     st.subheader("Prediction Distribution")
     
+    # Plotly is imported on first use to keep it off the app's startup path
+    import plotly.express as px
+    
     # Create distribution plot based on prediction type
-    if np.issubdtype(st.session_state.predictions.dtype, np.number):
+    if stats['is_numeric']:
         # Numerical predictions - histogram
         fig = px.histogram(
             x=st.session_state.predictions,
@@ -72,7 +139,7 @@ def render_prediction_panel():
         )
     else:
         # Categorical predictions - bar chart
-        pred_counts = pd.Series(st.session_state.predictions).value_counts()
+        pred_counts = stats['value_counts']
         fig = px.bar(
             x=pred_counts.index,
             y=pred_counts.values,
@@ -86,17 +153,14 @@ def render_prediction_panel():
     # Data table with predictions
     st.subheader("Predictions Table")
     
-    # Create display dataframe
-    display_df = st.session_state.raw_data.copy()
-    display_df['Prediction'] = st.session_state.predictions
-    
-    # Add probability columns if available
-    if hasattr(st.session_state, 'pred_probabilities') and st.session_state.pred_probabilities is not None:
-        prob_df = pd.DataFrame(
-            st.session_state.pred_probabilities,
-            columns=[f'Prob_Class_{i}' for i in range(st.session_state.pred_probabilities.shape[1])]
+    # The table is built once per set of predictions, not on every rerun
+    if st.session_state.get('predictions_table') is None:
+        st.session_state.predictions_table = build_display_df(
+            st.session_state.raw_data,
+            st.session_state.predictions,
+            st.session_state.get('pred_probabilities')
         )
-        display_df = pd.concat([display_df, prob_df], axis=1)
+    display_df = st.session_state.predictions_table
     
     # Add instance selection
     col1, col2 = st.columns([3, 1])
@@ -117,10 +181,11 @@ def render_prediction_panel():
     with col1:
         # Display the data table with highlighting for selected instance
         if 'selected_instance' in st.session_state and st.session_state.selected_instance is not None:
-            # Highlight selected row
-            styled_df = display_df.style.apply(
-                lambda x: ['background-color: #ffeb3b' if x.name == st.session_state.selected_instance else '' for _ in x],
-                axis=1
+            # Highlight selected row with a single indexer instead of a per-row lambda
+            selected_label = display_df.index[st.session_state.selected_instance]
+            styled_df = display_df.style.set_properties(
+                subset=pd.IndexSlice[[selected_label], :],
+                **{'background-color': '#ffeb3b'}
             )
             st.dataframe(styled_df, height=400, use_container_width=True)
         else:
@@ -130,7 +195,7 @@ def render_prediction_panel():
     st.subheader("Export Predictions")
     
     # Create CSV download
-    csv = display_df.to_csv(index=False)
+    csv = DataProcessor.to_csv_bytes(display_df)
     st.download_button(
         label="📥 Download Predictions as CSV",
         data=csv,
@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+import hashlib
 from utils.model_loader import ModelLoader
 from utils.data_processor import DataProcessor
 
@@ -19,8 +20,8 @@ def render_upload_section():
     st.markdown("**1. Upload ML Model**")
     model_file = st.file_uploader(
         "Choose a model file",
-        type=['pkl', 'pickle', 'joblib', 'jl'],
-        help="Upload a trained scikit-learn or XGBoost model in pickle/joblib format"
+        type=['pkl', 'pickle', 'joblib', 'jl', 'onnx'],
+        help="Upload a trained scikit-learn or XGBoost model in pickle/joblib format, or an exported ONNX model"
     )
     
     if model_file is not None:
@@ -29,6 +30,8 @@ def render_upload_section():
                 model = ModelLoader.load_model(model_file)
                 if model is not None:
                     st.session_state.model = model
+                    st.session_state.model_hash = hashlib.md5(model_file.getvalue()).hexdigest()
+                    st.session_state.model_caps = ModelLoader.get_model_capabilities(model)
                     
                     # Display model info
                     model_info = ModelLoader.get_model_info(model)
@@ -44,9 +47,9 @@ def render_upload_section():
     # Data upload
     st.markdown("**2. Upload Dataset**")
     data_file = st.file_uploader(
-        "Choose a CSV file",
-        type=['csv'],
-        help="Upload a CSV file with your dataset for analysis"
+        "Choose a CSV or Parquet file",
+        type=['csv', 'parquet'],
+        help="Upload a CSV or Parquet file with your dataset for analysis"
     )
     
     if data_file is not None:
@@ -75,9 +78,12 @@ def render_upload_section():
                         st.session_state.data_processor = processor
                         st.session_state.target = y
                         st.session_state.feature_names = feature_names
+                        st.session_state.data_hash = hashlib.md5(
+                            data_file.getvalue() + str(target_col).encode()
+                        ).hexdigest()
                         
                         # Display data info
-                        data_info = processor.get_data_info(df)
+                        data_info = processor.get_data_info(df, st.session_state.data_hash)
                         st.success(f"✅ Data loaded: {data_info['shape']} shape")
                         
                         with st.expander("Dataset Details"):
@@ -98,13 +104,18 @@ def render_upload_section():
     # Reset button
     if st.button("🔄 Reset All", help="Clear all loaded data and models"):
         st.session_state.model = None
+        st.session_state.model_hash = None
+        st.session_state.model_caps = None
         st.session_state.data = None
+        st.session_state.data_hash = None
         st.session_state.raw_data = None
         st.session_state.data_processor = None
         st.session_state.target = None
         st.session_state.feature_names = None
         st.session_state.explainer_manager = None
         st.session_state.predictions = None
+        st.session_state.prediction_stats = None
+        st.session_state.predictions_table = None
         st.session_state.selected_instance = None
         st.rerun()
     
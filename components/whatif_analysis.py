@@ -1,25 +1,189 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
+from functools import lru_cache
+import csv
+from io import BytesIO, TextIOWrapper
+from utils.model_loader import ModelLoader
+
+# Random generator for the "Add Random Noise" batch modification
+_rng = np.random.default_rng()
+
+# Feature count above which the fused numba noise kernel is used; below it
+# NumPy is already fast and the one-time JIT compile would dominate
+NUMBA_MIN_FEATURES = 10000
+
+# Number of saved what-if states the history arrays hold before growing
+HISTORY_INITIAL_CAPACITY = 256
+
+def predict_instance(model, instance, label_from_proba):
+    """
+    Predict a single instance with one model pass
+    
+    For classifiers the label is derived from predict_proba, so the model is
+    not traversed twice for the prediction and its probabilities.
+    
+    Args:
+        model: Trained ML model
+        instance: Feature array of shape (1, n_features)
+        label_from_proba: Whether the model has predict_proba and class labels
+        
+    Returns:
+        Tuple of (prediction, probabilities) where probabilities is None
+        if the model does not provide them
+    """
+    if label_from_proba:
+        proba = model.predict_proba(instance)[0]
+        return model.classes_[np.argmax(proba)], proba
+    
+    return model.predict(instance)[0], None
+
+@st.cache_data(max_entries=1024, show_spinner=False)
+def predict_instance_cached(_model, model_key, features, label_from_proba):
+    """
+    Cached wrapper around predict_instance
+    
+    Args:
+        _model: Trained ML model (not hashed)
+        model_key: Identifier of the loaded model, so reloading invalidates the cache
+        features: Tuple of feature values for one instance
+        label_from_proba: Whether the model has predict_proba and class labels
+        
+    Returns:
+        Tuple of (prediction, probabilities) as returned by predict_instance
+    """
+    return predict_instance(_model, np.asarray(features).reshape(1, -1), label_from_proba)
+
+@st.cache_data(show_spinner=False)
+def feature_ranges(_data, data_key):
+    """
+    Per-feature minimum and maximum of the dataset, computed once per dataset
+    
+    Args:
+        _data: Processed feature DataFrame (not hashed)
+        data_key: Identifier of the loaded dataset
+        
+    Returns:
+        DataFrame with 'min' and 'max' rows and one column per feature
+    """
+    return _data.agg(['min', 'max'])
+
+@st.cache_data(show_spinner=False)
+def slider_params(_data, data_key):
+    """
+    Slider bounds and step for every feature, computed in one vectorized pass
+    
+    Args:
+        _data: Processed feature DataFrame (not hashed)
+        data_key: Identifier of the loaded dataset
+        
+    Returns:
+        Dictionary mapping feature name to (slider_min, slider_max, step)
+    """
+    ranges = feature_ranges(_data, data_key)
+    min_vals = ranges.loc['min'].to_numpy(dtype=np.float64)
+    max_vals = ranges.loc['max'].to_numpy(dtype=np.float64)
+    
+    # Extend range slightly
+    range_extend = (max_vals - min_vals) * 0.2
+    slider_mins = min_vals - range_extend
+    slider_maxs = max_vals + range_extend
+    steps = (slider_maxs - slider_mins) / 100
+    
+    return dict(zip(ranges.columns, zip(slider_mins.tolist(), slider_maxs.tolist(), steps.tolist())))
+
+@lru_cache(maxsize=32)
+def _class_labels(n_classes):
+    """Class axis labels for the probability chart"""
+    return tuple(f'Class_{i}' for i in range(n_classes))
+
+def _model_key():
+    """Identifier of the currently loaded model"""
+    return st.session_state.get('model_hash') or id(st.session_state.model)
+
+def _model_caps():
+    """Capabilities of the loaded model, detected once and kept in session state"""
+    if st.session_state.get('model_caps') is None:
+        st.session_state.model_caps = ModelLoader.get_model_capabilities(st.session_state.model)
+    return st.session_state.model_caps
+
+def _predict_modified():
+    """Predict the current what-if instance through the prediction cache"""
+    caps = _model_caps()
+    features = tuple(st.session_state.whatif_modified.values.tolist())
+    label_from_proba = caps['proba'] and caps['n_classes'] > 0
+    return predict_instance_cached(st.session_state.model, _model_key(), features, label_from_proba)
+
+def _history_append(features, prediction, timestamp):
+    """
+    Append one what-if state to the preallocated history arrays
+    
+    The arrays are (re)allocated on the first save and doubled when full,
+    so saving a state is a row write rather than a new object per state.
+    
+    Args:
+        features: 1-D array of feature values
+        prediction: Model prediction for the state
+        timestamp: Time the state was saved (stored at second resolution)
+    """
+    ss = st.session_state
+    count = ss.whatif_hist_count
+    
+    if count == 0 or ss.whatif_hist_features.shape[1] != features.size:
+        ss.whatif_hist_features = np.empty((HISTORY_INITIAL_CAPACITY, features.size), dtype=np.float64)
+        ss.whatif_hist_preds = np.empty(HISTORY_INITIAL_CAPACITY, dtype=object)
+        ss.whatif_hist_timestamps = np.empty(HISTORY_INITIAL_CAPACITY, dtype='datetime64[s]')
+        count = 0
+    elif count == len(ss.whatif_hist_features):
+        capacity = 2 * count
+        for name in ('whatif_hist_features', 'whatif_hist_preds', 'whatif_hist_timestamps'):
+            old = ss[name]
+            grown = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            grown[:count] = old
+            ss[name] = grown
+    
+    ss.whatif_hist_features[count] = features
+    ss.whatif_hist_preds[count] = prediction
+    ss.whatif_hist_timestamps[count] = timestamp
+    ss.whatif_hist_count = count + 1
+    # Predictions are saved with the current model; mark them so the next
+    # render does not recompute them with the model's raw predict()
+    ss.whatif_history_model = _model_key()
+
+def _history_features():
+    """Saved what-if states as a (n_states, n_features) view of the history array"""
+    return st.session_state.whatif_hist_features[:st.session_state.whatif_hist_count]
+
+def _recompute_history_predictions():
+    """Re-predict every saved what-if state with the current model in one call"""
+    count = st.session_state.whatif_hist_count
+    st.session_state.whatif_hist_preds[:count] = st.session_state.model.predict(_history_features())
+    st.session_state.whatif_history_model = _model_key()
 
 def render_whatif_analysis():
     """Render the what-if analysis panel for feature manipulation"""
     st.header("🔄 What-If Analysis")
     st.markdown("Modify feature values to see how they affect model predictions")
     
-    if st.session_state.model is None or st.session_state.data is None:
+    # Bind session state lookups once per rerun
+    ss = st.session_state
+    data = ss.data
+    model = ss.model
+    
+    if model is None or data is None:
         st.warning("Please upload both model and data first.")
         return
     
+    n_rows = len(data)
+    data_key = ss.get('data_hash') or id(data)
+    
     # Initialize what-if session state
-    if 'whatif_instance' not in st.session_state:
-        st.session_state.whatif_instance = None
-    if 'whatif_modified' not in st.session_state:
-        st.session_state.whatif_modified = None
-    if 'whatif_history' not in st.session_state:
-        st.session_state.whatif_history = []
+    if 'whatif_instance' not in ss:
+        ss.whatif_instance = None
+    if 'whatif_modified' not in ss:
+        ss.whatif_modified = None
+    if 'whatif_hist_count' not in ss:
+        ss.whatif_hist_count = 0
     
     # Instance selection section
     col1, col2 = st.columns([2, 1])
@@ -28,36 +192,40 @@ def render_whatif_analysis():
         st.subheader("📋 Select Base Instance")
         
         # Use selected instance from other panels if available
-        default_idx = st.session_state.selected_instance if st.session_state.selected_instance is not None else 0
+        default_idx = ss.selected_instance if ss.selected_instance is not None else 0
         
         base_instance_idx = st.number_input(
             "Base Instance Index",
             min_value=0,
-            max_value=len(st.session_state.data) - 1,
+            max_value=n_rows - 1,
             value=default_idx,
             step=1,
             key="whatif_base_selector"
         )
         
         if st.button("🎯 Load Instance", key="load_whatif_instance"):
-            # Load the selected instance
-            st.session_state.whatif_instance = st.session_state.data.iloc[base_instance_idx].copy()
-            st.session_state.whatif_modified = st.session_state.whatif_instance.copy()
+            # Load the selected instance (iloc already returns a new Series and
+            # modifications always build new Series, so no copies are needed)
+            ss.whatif_instance = data.iloc[base_instance_idx]
+            ss.whatif_modified = ss.whatif_instance
+            ss.whatif_feature_index = data.columns
             st.success(f"Loaded instance {base_instance_idx}")
         
         # Reset button
         if st.button("🔄 Reset to Original", key="reset_whatif"):
-            if st.session_state.whatif_instance is not None:
-                st.session_state.whatif_modified = st.session_state.whatif_instance.copy()
+            if ss.whatif_instance is not None:
+                ss.whatif_modified = ss.whatif_instance
                 st.success("Reset to original values")
     
+    # The instance buttons above are the only writes before this point
+    modified = ss.whatif_modified
+    
     with col1:
-        if st.session_state.whatif_instance is not None:
+        if ss.whatif_instance is not None:
             st.subheader("📊 Current Prediction")
             
-            # Get current prediction
-            current_instance = st.session_state.whatif_modified.values.reshape(1, -1)
-            current_pred = st.session_state.model.predict(current_instance)[0]
+            # Get current prediction (cached on the model and feature values)
+            current_pred, current_proba = _predict_modified()
             
             # Display prediction
             col_pred1, col_pred2 = st.columns(2)
@@ -66,34 +234,41 @@ def render_whatif_analysis():
                 st.metric("Current Prediction", f"{current_pred}")
             
             # Show probabilities if available
-            if hasattr(st.session_state.model, 'predict_proba'):
-                try:
-                    current_proba = st.session_state.model.predict_proba(current_instance)[0]
-                    max_prob = np.max(current_proba)
-                    with col_pred2:
-                        st.metric("Confidence", f"{max_prob:.3f}")
-                    
-                    # Show probability distribution
-                    prob_df = pd.DataFrame({
-                        'Class': [f'Class_{i}' for i in range(len(current_proba))],
-                        'Probability': current_proba
-                    })
-                    
-                    fig_prob = px.bar(
-                        prob_df,
-                        x='Class',
-                        y='Probability',
-                        title="Prediction Probabilities"
-                    )
-                    fig_prob.update_layout(height=300)
-                    st.plotly_chart(fig_prob, use_container_width=True)
-                    
-                except:
-                    pass
+            if current_proba is not None:
+                max_prob = np.max(current_proba)
+                with col_pred2:
+                    st.metric("Confidence", f"{max_prob:.3f}")
+                
+                # Show probability distribution
+                import plotly.graph_objects as go
+                fig_prob = go.Figure(go.Bar(x=_class_labels(len(current_proba)), y=current_proba))
+                fig_prob.update_layout(
+                    title="Prediction Probabilities",
+                    xaxis_title="Class",
+                    yaxis_title="Probability",
+                    height=300
+                )
+                st.plotly_chart(fig_prob, use_container_width=True)
     
     # Feature modification section
-    if st.session_state.whatif_instance is not None:
+    if ss.whatif_instance is not None:
         st.subheader("🎛️ Modify Features")
+        feature_index = modified.index
+        
+        # Dtype kinds of the feature columns and the mask of columns that batch
+        # modifications may touch (numeric and not label-encoded), computed
+        # once per dataset (keyed on the upload hash, as ids can be reused)
+        if ss.get('whatif_feature_kinds_key') != data_key:
+            ss.whatif_feature_kinds = tuple(dtype.kind for dtype in data.dtypes)
+            processor = ss.get('data_processor')
+            encoded = processor.label_encoders if processor is not None else {}
+            ss.whatif_numeric_mask = np.array([
+                kind in 'fiu' and column not in encoded
+                for column, kind in zip(data.columns, ss.whatif_feature_kinds)
+            ], dtype=bool)
+            ss.whatif_feature_kinds_key = data_key
+        feature_kinds = ss.whatif_feature_kinds
+        numeric_mask = ss.whatif_numeric_mask
         
         # Create tabs for different modification approaches
         tab1, tab2, tab3 = st.tabs(["Manual Edit", "Slider Controls", "Batch Modifications"])
@@ -101,40 +276,29 @@ def render_whatif_analysis():
         with tab1:
             st.markdown("**Edit individual feature values manually:**")
             
-            # Display original and current values in editable form
-            original_values = st.session_state.whatif_instance
-            modified_values = st.session_state.whatif_modified.copy()
-            
             # Create form for editing
             with st.form("manual_edit_form"):
-                edited_values = {}
+                # Inputs are written straight into one float64 buffer
+                edited_values = np.empty(len(modified), dtype=np.float64)
                 
                 # Create columns for better layout
                 num_cols = 3
                 cols = st.columns(num_cols)
                 
-                for i, (feature, value) in enumerate(modified_values.items()):
+                for i, (feature, value) in enumerate(modified.items()):
                     col_idx = i % num_cols
                     
                     with cols[col_idx]:
-                        # Determine input type based on data type
-                        if np.issubdtype(type(value), np.integer):
-                            edited_values[feature] = st.number_input(
+                        # Determine input type based on the column's data type
+                        if feature_kinds[i] in 'iu':
+                            edited_values[i] = st.number_input(
                                 f"{feature}",
                                 value=int(value),
                                 step=1,
                                 key=f"manual_{feature}"
                             )
-                        elif np.issubdtype(type(value), np.floating):
-                            edited_values[feature] = st.number_input(
-                                f"{feature}",
-                                value=float(value),
-                                step=0.01,
-                                format="%.3f",
-                                key=f"manual_{feature}"
-                            )
                         else:
-                            edited_values[feature] = st.number_input(
+                            edited_values[i] = st.number_input(
                                 f"{feature}",
                                 value=float(value),
                                 step=0.01,
@@ -143,7 +307,7 @@ def render_whatif_analysis():
                             )
                 
                 if st.form_submit_button("✅ Apply Changes"):
-                    st.session_state.whatif_modified = pd.Series(edited_values)
+                    ss.whatif_modified = pd.Series(edited_values, index=feature_index, copy=False)
                     st.success("Features updated!")
                     st.rerun()
         
@@ -151,41 +315,34 @@ def render_whatif_analysis():
             st.markdown("**Use sliders to modify features:**")
             
             # Select features to modify with sliders
+            feature_list = feature_index.tolist()
             selected_features = st.multiselect(
                 "Select features to modify:",
-                options=list(st.session_state.whatif_modified.index),
-                default=list(st.session_state.whatif_modified.index)[:5],  # Default to first 5
+                options=feature_list,
+                default=feature_list[:5],  # Default to first 5
                 key="slider_features"
             )
             
             if selected_features:
                 slider_values = {}
+                params = slider_params(data, data_key)
                 
                 for feature in selected_features:
-                    current_value = st.session_state.whatif_modified[feature]
-                    
-                    # Calculate reasonable range based on data distribution
-                    feature_data = st.session_state.data[feature]
-                    min_val = float(feature_data.min())
-                    max_val = float(feature_data.max())
-                    
-                    # Extend range slightly
-                    range_extend = (max_val - min_val) * 0.2
-                    slider_min = min_val - range_extend
-                    slider_max = max_val + range_extend
+                    slider_min, slider_max, step = params[feature]
                     
                     slider_values[feature] = st.slider(
                         f"{feature}",
                         min_value=slider_min,
                         max_value=slider_max,
-                        value=float(current_value),
-                        step=(slider_max - slider_min) / 100,
+                        value=float(modified[feature]),
+                        step=step,
                         key=f"slider_{feature}"
                     )
                 
                 if st.button("🎚️ Apply Slider Values", key="apply_sliders"):
-                    for feature, value in slider_values.items():
-                        st.session_state.whatif_modified[feature] = value
+                    values = modified.to_numpy(dtype=np.float64, copy=True)
+                    values[feature_index.get_indexer(list(slider_values))] = list(slider_values.values())
+                    ss.whatif_modified = pd.Series(values, index=feature_index, copy=False)
                     st.success("Slider values applied!")
                     st.rerun()
         
@@ -196,7 +353,7 @@ def render_whatif_analysis():
             col1, col2 = st.columns(2)
             
             with col1:
-                st.markdown("**Scale all features:**")
+                st.markdown("**Scale all numeric features:**")
                 scale_factor = st.slider(
                     "Scale factor",
                     min_value=0.1,
@@ -207,8 +364,11 @@ def render_whatif_analysis():
                 )
                 
                 if st.button("📈 Apply Scaling", key="apply_scaling"):
-                    st.session_state.whatif_modified = st.session_state.whatif_modified * scale_factor
-                    st.success(f"All features scaled by {scale_factor}")
+                    # Encoded categorical columns are left untouched
+                    values = modified.to_numpy(dtype=np.float64, copy=True)
+                    values[numeric_mask] *= scale_factor
+                    ss.whatif_modified = pd.Series(values, index=feature_index, copy=False)
+                    st.success(f"All numeric features scaled by {scale_factor}")
                     st.rerun()
             
             with col2:
@@ -223,46 +383,52 @@ def render_whatif_analysis():
                 )
                 
                 if st.button("🎲 Add Random Noise", key="add_noise"):
-                    noise = np.random.normal(0, noise_level/100, len(st.session_state.whatif_modified))
-                    st.session_state.whatif_modified = st.session_state.whatif_modified * (1 + noise)
+                    values = modified.to_numpy(dtype=np.float64, copy=True)
+                    numeric_values = values[numeric_mask]
+                    noisy = None
+                    if numeric_values.size >= NUMBA_MIN_FEATURES:
+                        # Imported here so numba's import cost is only paid for wide models
+                        try:
+                            from components._numba_kernels import apply_noise
+                        except ImportError:
+                            pass
+                        else:
+                            noisy = apply_noise(numeric_values, noise_level / 100.0, int(_rng.integers(2**31)))
+                    if noisy is None:
+                        noisy = numeric_values * (1.0 + _rng.standard_normal(numeric_values.size) * (noise_level / 100.0))
+                    values[numeric_mask] = noisy
+                    ss.whatif_modified = pd.Series(values, index=feature_index, copy=False)
                     st.success(f"Added {noise_level}% noise")
                     st.rerun()
         
         # Save current state to history
         if st.button("💾 Save Current State", key="save_state"):
-            current_pred = st.session_state.model.predict(
-                st.session_state.whatif_modified.values.reshape(1, -1)
-            )[0]
-            
-            state = {
-                'features': st.session_state.whatif_modified.copy(),
-                'prediction': current_pred,
-                'timestamp': pd.Timestamp.now()
-            }
-            
-            st.session_state.whatif_history.append(state)
+            current_pred, _ = _predict_modified()
+            _history_append(modified.to_numpy(dtype=np.float64), current_pred, np.datetime64(pd.Timestamp.now(), 's'))
             st.success("State saved to history!")
         
         # History section
-        if st.session_state.whatif_history:
+        n_states = ss.whatif_hist_count
+        if n_states:
             st.subheader("📚 Modification History")
             
-            # Display history table
-            history_data = []
-            for i, state in enumerate(st.session_state.whatif_history):
-                history_data.append({
-                    'Index': i,
-                    'Prediction': state['prediction'],
-                    'Timestamp': state['timestamp'].strftime("%H:%M:%S")
-                })
+            # Saved predictions are stale if a different model was loaded since
+            if ss.get('whatif_history_model') != _model_key():
+                _recompute_history_predictions()
             
-            history_df = pd.DataFrame(history_data)
+            # Display history table
+            history_preds = ss.whatif_hist_preds[:n_states]
+            history_df = pd.DataFrame({
+                'Index': np.arange(n_states),
+                'Prediction': history_preds,
+                'Timestamp': pd.to_datetime(ss.whatif_hist_timestamps[:n_states]).strftime("%H:%M:%S")
+            })
             
             # Add selection
             selected_history = st.selectbox(
                 "Select a saved state to restore:",
-                options=range(len(st.session_state.whatif_history)),
-                format_func=lambda x: f"State {x}: Pred={st.session_state.whatif_history[x]['prediction']:.3f}",
+                options=range(n_states),
+                format_func=lambda x: f"State {x}: Pred={history_preds[x]:.3f}",
                 key="history_selector"
             )
             
@@ -270,26 +436,41 @@ def render_whatif_analysis():
             
             with col1:
                 if st.button("🔄 Restore Selected", key="restore_history"):
-                    st.session_state.whatif_modified = st.session_state.whatif_history[selected_history]['features']
+                    # Copy the row so later saves cannot overwrite the restored values
+                    ss.whatif_modified = pd.Series(
+                        ss.whatif_hist_features[selected_history].copy(),
+                        index=ss.whatif_feature_index,
+                        copy=False
+                    )
                     st.success(f"Restored state {selected_history}")
                     st.rerun()
             
             with col2:
                 if st.button("🗑️ Clear History", key="clear_history"):
-                    st.session_state.whatif_history = []
+                    ss.whatif_hist_count = 0
                     st.success("History cleared")
                     st.rerun()
             
             with col3:
                 # Download history
                 if st.button("📥 Export History", key="export_history"):
-                    history_export = []
-                    for i, state in enumerate(st.session_state.whatif_history):
-                        row = {'State_Index': i, 'Prediction': state['prediction']}
-                        row.update(state['features'].to_dict())
-                        history_export.append(row)
+                    # Write the stacked states straight to CSV; the csv module
+                    # quotes feature names and labels containing commas or
+                    # quotes, and floats keep their shortest round-trip repr
+                    history_features = _history_features()
+                    rows = np.empty((len(history_features), history_features.shape[1] + 2), dtype=object)
+                    rows[:, 0] = history_df['Index'].to_numpy()
+                    rows[:, 1] = history_df['Prediction'].to_numpy()
+                    rows[:, 2:] = history_features
                     
-                    history_csv = pd.DataFrame(history_export).to_csv(index=False)
+                    buffer = BytesIO()
+                    text = TextIOWrapper(buffer, encoding='utf-8', newline='')
+                    writer = csv.writer(text, lineterminator='\n')
+                    writer.writerow(['State_Index', 'Prediction'] + list(ss.whatif_feature_index))
+                    writer.writerows(rows.tolist())
+                    text.flush()
+                    history_csv = buffer.getvalue()
+                    text.detach()
                     st.download_button(
                         label="📄 Download History CSV",
                         data=history_csv,
@@ -3,8 +3,11 @@ import numpy as np
 from sklearn.datasets import make_classification, make_regression
 from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
 import joblib
+import json
+
+# Single seeded random generator for the categorical sample columns
+rng = np.random.default_rng(42)
 
 # Create sample classification dataset
 def create_classification_dataset():
@@ -26,9 +29,10 @@ def create_classification_dataset():
     df = pd.DataFrame(X, columns=feature_names)
     df['target'] = y
     
-    # Add some categorical features
-    df['category_A'] = np.random.choice(['Type1', 'Type2', 'Type3'], size=len(df))
-    df['category_B'] = np.random.choice(['Small', 'Medium', 'Large'], size=len(df))
+    # Add some categorical features (categories are sorted so the codes match
+    # the dashboard's alphabetical label encoding)
+    df['category_A'] = pd.Categorical.from_codes(rng.integers(0, 3, size=len(df), dtype=np.int8), categories=['Type1', 'Type2', 'Type3'])
+    df['category_B'] = pd.Categorical.from_codes(rng.integers(0, 3, size=len(df), dtype=np.int8), categories=['Large', 'Medium', 'Small'])
     
     return df
 
@@ -51,12 +55,47 @@ def create_regression_dataset():
     df = pd.DataFrame(X, columns=feature_names)
     df['target'] = y
     
-    # Add some categorical features
-    df['region'] = np.random.choice(['North', 'South', 'East', 'West'], size=len(df))
-    df['size_category'] = np.random.choice(['XS', 'S', 'M', 'L', 'XL'], size=len(df))
+    # Add some categorical features (categories are sorted so the codes match
+    # the dashboard's alphabetical label encoding)
+    df['region'] = pd.Categorical.from_codes(rng.integers(0, 4, size=len(df), dtype=np.int8), categories=['East', 'North', 'South', 'West'])
+    df['size_category'] = pd.Categorical.from_codes(rng.integers(0, 5, size=len(df), dtype=np.int8), categories=['L', 'M', 'S', 'XL', 'XS'])
     
     return df
 
+# Export a fitted model to ONNX when skl2onnx is available
+def export_onnx(model, n_features, path):
+    """
+    Save an ONNX copy of a fitted model for ONNX Runtime inference
+    
+    Args:
+        model: Fitted scikit-learn model
+        n_features: Number of input features
+        path: Output .onnx file path
+        
+    Returns:
+        True if the model was exported, False if skl2onnx is not installed
+    """
+    try:
+        from skl2onnx import convert_sklearn
+        from skl2onnx.common.data_types import FloatTensorType
+    except ImportError:
+        return False
+    
+    # Classifiers output a plain probability tensor (no zipmap) so the
+    # dashboard's adapter can return it from predict_proba directly
+    is_classifier = hasattr(model, 'classes_')
+    options = {id(model): {'zipmap': False}} if is_classifier else None
+    onx = convert_sklearn(model, initial_types=[('input', FloatTensorType([None, n_features]))], options=options)
+    
+    if is_classifier:
+        meta = onx.metadata_props.add()
+        meta.key = 'classes'
+        meta.value = json.dumps(model.classes_.tolist())
+    
+    with open(path, 'wb') as f:
+        f.write(onx.SerializeToString())
+    return True
+
 # Train and save models
 def train_and_save_models():
     """Train sample models and save them"""
@@ -69,19 +108,21 @@ def train_and_save_models():
     X_class = class_df.drop(['target'], axis=1)
     y_class = class_df['target']
     
-    # Encode categorical variables
-    le_dict = {}
+    # Encode categorical variables with their integer codes
     for col in ['category_A', 'category_B']:
-        le = LabelEncoder()
-        X_class[col] = le.fit_transform(X_class[col])
-        le_dict[col] = le
+        X_class[col] = X_class[col].cat.codes
     
     # Train classification model
-    clf = RandomForestClassifier(n_estimators=100, random_state=42)
+    clf = RandomForestClassifier(n_estimators=100, n_jobs=-1, random_state=42)
     clf.fit(X_class, y_class)
     
+    # Fit in parallel, but predict single-threaded: the dashboard mostly
+    # predicts one row at a time, where thread dispatch costs more than it saves
+    clf.set_params(n_jobs=None)
+    
     # Save classification model and data
-    joblib.dump(clf, 'sample_models/classification_model.joblib')
+    joblib.dump(clf, 'sample_models/classification_model.joblib', compress=3)
+    onnx_saved = export_onnx(clf, X_class.shape[1], 'sample_models/classification_model.onnx')
     class_df.to_csv('sample_data/classification_data.csv', index=False)
     
     # Regression model
@@ -92,23 +133,27 @@ def train_and_save_models():
     X_reg = reg_df.drop(['target'], axis=1)
     y_reg = reg_df['target']
     
-    # Encode categorical variables
+    # Encode categorical variables with their integer codes
     for col in ['region', 'size_category']:
-        le = LabelEncoder()
-        X_reg[col] = le.fit_transform(X_reg[col])
+        X_reg[col] = X_reg[col].cat.codes
     
     # Train regression model
-    reg = RandomForestRegressor(n_estimators=100, random_state=42)
+    reg = RandomForestRegressor(n_estimators=100, n_jobs=-1, random_state=42)
     reg.fit(X_reg, y_reg)
+    reg.set_params(n_jobs=None)
     
     # Save regression model and data
-    joblib.dump(reg, 'sample_models/regression_model.joblib')
+    joblib.dump(reg, 'sample_models/regression_model.joblib', compress=3)
+    export_onnx(reg, X_reg.shape[1], 'sample_models/regression_model.onnx')
     reg_df.to_csv('sample_data/regression_data.csv', index=False)
     
     print("Sample models and datasets created successfully!")
     print("Files created:")
     print("- sample_models/classification_model.joblib")
     print("- sample_models/regression_model.joblib") 
+    if onnx_saved:
+        print("- sample_models/classification_model.onnx")
+        print("- sample_models/regression_model.onnx")
     print("- sample_data/classification_data.csv")
     print("- sample_data/regression_data.csv")
 
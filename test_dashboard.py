@@ -93,26 +93,129 @@ def test_basic_functionality():
         
         # Create simple test data
         test_data = pd.DataFrame({
-            'numeric_col': [1, 2, 3, 4, 5],
+            'numeric_col': [1.0, 2.0, np.nan, 4.0, 5.0],
             'categorical_col': ['A', 'B', 'A', 'C', 'B'],
             'target': [0, 1, 0, 1, 1]
         })
+        original = test_data.copy()
         
         # Test data processor
         processor = DataProcessor()
         X, y, feature_names = processor.prepare_features(test_data, 'target')
         
-        if X is not None and len(feature_names) == 2:
-            print("✅ Data processing works correctly")
-            return True
-        else:
+        if X is None or len(feature_names) != 2:
             print("❌ Data processing failed")
             return False
+        
+        # Categories are coded in sorted class order
+        codes = X['categorical_col']
+        if codes.dtype != np.int8 or codes.tolist() != [0, 1, 0, 2, 1]:
+            print("❌ Categorical codes do not match the sorted classes")
+            return False
+        
+        # Missing numeric values are filled with the column mean
+        if X['numeric_col'].isna().any() or X['numeric_col'].iloc[2] != 3.0:
+            print("❌ Missing values were not filled with the column mean")
+            return False
+        
+        # Encoding without a target works on a shallow copy of the input
+        processor_no_target = DataProcessor()
+        X_no_target, _, _ = processor_no_target.prepare_features(test_data)
+        if X_no_target is None or not test_data.equals(original):
+            print("❌ Input DataFrame was modified during processing")
+            return False
+        
+        # Decoding restores the original categorical values
+        decoded = processor.reverse_encode_features(X)
+        if decoded['categorical_col'].tolist() != original['categorical_col'].tolist():
+            print("❌ Reverse encoding did not restore the original values")
+            return False
+        
+        print("✅ Data processing works correctly")
+        return True
             
     except Exception as e:
         print(f"❌ Basic functionality test failed: {e}")
         return False
 
+def test_timestamp_columns():
+    """Test that timestamp columns parsed by the pyarrow CSV engine are encoded"""
+    print("🧪 Testing timestamp columns...")
+    
+    try:
+        import tempfile
+        from sklearn.tree import DecisionTreeClassifier
+        from utils.data_processor_test import DataProcessor
+        
+        csv_text = (
+            "ts,x,target\n"
+            "2024-01-02 11:00:00,1.5,0\n"
+            "2024-01-01 10:00:00,2.5,1\n"
+            "2024-01-03 09:00:00,3.5,0\n"
+        )
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = Path(tmp_dir) / "timestamps.csv"
+            csv_path.write_text(csv_text)
+            df = DataProcessor.load_data(str(csv_path))
+        
+        processor = DataProcessor()
+        X, y, feature_names = processor.prepare_features(df, 'target')
+        
+        if X is None or X['ts'].dtype.kind not in 'iu' or X['ts'].tolist() != [1, 0, 2]:
+            print("❌ Timestamp column was not label encoded")
+            return False
+        
+        # The encoded frame must be usable as model input
+        model = DecisionTreeClassifier(random_state=0).fit(X, y)
+        model.predict(X)
+        
+        print("✅ Timestamp columns are encoded correctly")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Timestamp column test failed: {e}")
+        return False
+
+def test_onnx_zipmap_classifier():
+    """Test that a classifier exported with skl2onnx's default ZipMap loads"""
+    print("🧪 Testing ONNX ZipMap classifier...")
+    
+    try:
+        import joblib
+        from skl2onnx import convert_sklearn
+        from skl2onnx.common.data_types import FloatTensorType
+        from utils.model_loader import ModelLoader
+        
+        class_model = joblib.load(project_root / "sample_models" / "classification_model.joblib")
+        n_features = class_model.n_features_in_
+        onx = convert_sklearn(class_model, initial_types=[('input', FloatTensorType([None, n_features]))])
+        
+        model = ModelLoader.load_onnx_model(onx.SerializeToString())
+        if model is None:
+            print("❌ ZipMap classifier was rejected")
+            return False
+        
+        X = np.random.default_rng(0).standard_normal((5, n_features))
+        proba = model.predict_proba(X)
+        if proba.shape != (5, len(class_model.classes_)) or list(model.classes_) != list(class_model.classes_):
+            print("❌ ZipMap probabilities or classes were not unpacked")
+            return False
+        
+        if not np.allclose(proba, class_model.predict_proba(X), atol=1e-4):
+            print("❌ ZipMap probabilities do not match the scikit-learn model")
+            return False
+        
+        print("✅ ZipMap classifier loads correctly")
+        return True
+        
+    except ImportError:
+        print("⚠️ skl2onnx or onnxruntime not available, skipping ONNX test")
+        return True
+    
+    except Exception as e:
+        print(f"❌ ONNX ZipMap test failed: {e}")
+        return False
+
 def run_all_tests():
     """Run all tests"""
     print("🚀 Running Model Interpretation Dashboard Tests\n")
@@ -122,6 +225,8 @@ def run_all_tests():
         ("Sample Models", test_sample_models),
         ("Component Imports", test_component_imports),
         ("Basic Functionality", test_basic_functionality),
+        ("Timestamp Columns", test_timestamp_columns),
+        ("ONNX ZipMap Classifier", test_onnx_zipmap_classifier),
     ]
     
     passed = 0
@@ -1,6 +1,6 @@
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import LabelEncoder
+from io import BytesIO
 
 # Mock streamlit for testing
 try:
@@ -13,6 +13,11 @@ except ImportError:
         def info(self, msg): print(f"INFO: {msg}")
     st = MockStreamlit()
 
+# Column dtypes treated as categorical and label encoded. The pyarrow CSV
+# parser turns timestamp-like text into datetime/timedelta columns (the C
+# engine leaves it as text), so those are encoded from their text form too
+CATEGORICAL_DTYPES = ['object', 'string', 'category', 'datetime', 'datetimetz', 'timedelta']
+
 class DataProcessor:
     """Utility class for processing and preparing data"""
     
@@ -24,7 +29,7 @@ class DataProcessor:
     @staticmethod
     def load_data(uploaded_file):
         """
-        Load data from uploaded CSV file
+        Load data from uploaded CSV or Parquet file
         
         Args:
             uploaded_file: Streamlit uploaded file object or file path
@@ -34,14 +39,21 @@ class DataProcessor:
         """
         try:
             # Handle both file objects and file paths
-            if hasattr(uploaded_file, 'read'):
-                df = pd.read_csv(uploaded_file)
+            name = str(getattr(uploaded_file, 'name', uploaded_file))
+            if name.lower().endswith('.parquet'):
+                df = pd.read_parquet(uploaded_file)
             else:
-                df = pd.read_csv(uploaded_file)
+                # Same parser as the app: pyarrow, falling back to the C engine
+                try:
+                    df = pd.read_csv(uploaded_file, engine='pyarrow')
+                except (ImportError, ValueError):
+                    if hasattr(uploaded_file, 'seek'):
+                        uploaded_file.seek(0)
+                    df = pd.read_csv(uploaded_file)
             
             # Basic validation
             if df.empty:
-                st.error("Uploaded CSV file is empty.")
+                st.error("Uploaded data file is empty.")
                 return None
             
             if df.shape[1] < 2:
@@ -54,6 +66,21 @@ class DataProcessor:
             st.error(f"Error loading data: {str(e)}")
             return None
     
+    @staticmethod
+    def to_csv_bytes(df):
+        """
+        Encode a DataFrame as CSV bytes for download buttons
+        
+        Args:
+            df: pandas DataFrame
+            
+        Returns:
+            UTF-8 encoded CSV bytes (without the index)
+        """
+        buffer = BytesIO()
+        df.to_csv(buffer, index=False, encoding='utf-8')
+        return buffer.getvalue()
+    
     def prepare_features(self, df, target_column=None):
         """
         Prepare features for model prediction and explanation
@@ -72,27 +99,47 @@ class DataProcessor:
                     st.error(f"Target column '{target_column}' not found in dataset.")
                     return None, None, []
                 
-                X = df.drop(columns=[target_column])
+                # drop already returns a new frame, so it is encoded directly
+                X_processed = df.drop(columns=[target_column])
                 y = df[target_column]
                 self.target_column = target_column
             else:
-                X = df.copy()
+                # Shallow copy: encoded columns are assigned as new arrays and
+                # never written in place, so the uploaded frame is untouched
+                X_processed = df.copy(deep=False)
                 y = None
             
             # Store original feature names
-            self.feature_names = list(X.columns)
+            self.feature_names = list(X_processed.columns)
             
-            # Handle categorical variables
-            X_processed = X.copy()
-            for column in X.columns:
-                if X[column].dtype == 'object':
-                    # Use label encoding for categorical variables
-                    le = LabelEncoder()
-                    X_processed[column] = le.fit_transform(X[column].astype(str))
-                    self.label_encoders[column] = le
+            # Handle categorical variables with label encoding: factorize
+            # with sorted classes gives the same codes as LabelEncoder, and
+            # the classes array is kept to reverse the encoding. Codes are
+            # stored in the smallest signed integer type that fits
+            categorical_columns = X_processed.select_dtypes(include=CATEGORICAL_DTYPES).columns
+            for column in categorical_columns:
+                codes, classes = pd.factorize(X_processed[column].astype(str), sort=True, use_na_sentinel=False)
+                if len(classes) <= np.iinfo(np.int8).max:
+                    code_dtype = np.int8
+                elif len(classes) <= np.iinfo(np.int16).max:
+                    code_dtype = np.int16
+                else:
+                    code_dtype = np.int32
+                X_processed[column] = codes.astype(code_dtype)
+                self.label_encoders[column] = classes.to_numpy()
             
-            # Handle missing values
-            X_processed = X_processed.fillna(X_processed.mean())
+            # Handle missing values: fill with column means in one NumPy pass
+            # and write back only the columns that had gaps
+            numeric_columns = X_processed.select_dtypes(include=[np.number]).columns
+            values = X_processed[numeric_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+            missing = np.isnan(values)
+            if missing.any():
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    means = np.where(missing, 0.0, values).sum(axis=0) / (~missing).sum(axis=0)
+                rows, cols = np.nonzero(missing)
+                values[rows, cols] = means[cols]
+                filled = missing.any(axis=0)
+                X_processed[numeric_columns[filled]] = values[:, filled]
             
             return X_processed, y, self.feature_names
             
@@ -100,12 +147,14 @@ class DataProcessor:
             st.error(f"Error preparing features: {str(e)}")
             return None, None, []
     
-    def get_data_info(self, df):
+    def get_data_info(self, df, data_key=None):
         """
         Get information about the dataset
         
         Args:
             df: pandas DataFrame
+            data_key: Optional content hash of the dataset; accepted for parity
+                with the app's DataProcessor, the summary is not cached here
             
         Returns:
             Dictionary with dataset information
@@ -115,7 +164,7 @@ class DataProcessor:
             'columns': list(df.columns),
             'dtypes': df.dtypes.to_dict(),
             'missing_values': df.isnull().sum().to_dict(),
-            'categorical_columns': list(df.select_dtypes(include=['object']).columns),
+            'categorical_columns': list(df.select_dtypes(include=CATEGORICAL_DTYPES).columns),
             'numerical_columns': list(df.select_dtypes(include=[np.number]).columns)
         }
         
@@ -137,11 +186,20 @@ class DataProcessor:
         
         X_display = pd.DataFrame(X, columns=feature_names)
         
-        for column, le in self.label_encoders.items():
+        for column, classes in self.label_encoders.items():
             if column in X_display.columns:
-                try:
-                    X_display[column] = le.inverse_transform(X_display[column].astype(int))
-                except:
-                    pass  # Keep encoded values if inverse transform fails
+                codes = X_display[column].to_numpy()
+                if codes.dtype.kind == 'f':
+                    # NaN or fractional values are not codes; leave the column as is
+                    if not np.isfinite(codes).all() or (codes != np.floor(codes)).any():
+                        continue
+                    codes = codes.astype(np.intp)
+                elif codes.dtype.kind not in 'iu':
+                    # Non-numeric columns are already decoded
+                    continue
+                
+                # Keep encoded values if any code has no class (e.g. edited)
+                if codes.size and (codes.min() >= 0) and (codes.max() < len(classes)):
+                    X_display[column] = classes[codes]
         
         return X_display
\ No newline at end of file
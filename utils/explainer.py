@@ -1,16 +1,22 @@
 import streamlit as st
-import shap
-import lime
-import lime.lime_tabular
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+
+# Number of k-means centroids summarizing the KernelExplainer background
+KERNEL_BACKGROUND_CLUSTERS = 10
+
+# Datasets up to this size get SHAP values for every row computed in one
+# batch on first use, when the explainer is a fast (tree/linear) one
+SHAP_PRECOMPUTE_MAX_ROWS = 2000
 
 class ExplainerManager:
     """Manager class for SHAP and LIME explainers"""
     
+    __slots__ = (
+        'model', 'data', 'shap_explainer', 'lime_explainer', 'background_data',
+        '_data_f32', '_predict', '_predict_proba', '_shap_cache', '_precompute_shap'
+    )
+    
     def __init__(self, model, data):
         """
         Initialize explainers
@@ -21,9 +27,19 @@ class ExplainerManager:
         """
         self.model = model
         self.data = data
+        
+        # Bind the prediction methods once; LIME and SHAP call them per batch
+        self._predict = model.predict
+        self._predict_proba = getattr(model, 'predict_proba', None)
+        
+        # Contiguous float32 copy of the features for the explainers' inner
+        # loops; the DataFrame is kept for column names and display values
+        self._data_f32 = np.ascontiguousarray(data.to_numpy(dtype=np.float32))
         self.shap_explainer = None
         self.lime_explainer = None
         self.background_data = None
+        self._shap_cache = {}
+        self._precompute_shap = False
         
         # Initialize explainers
         self._initialize_shap()
@@ -31,12 +47,15 @@ class ExplainerManager:
     
     def _initialize_shap(self):
         """Initialize SHAP explainer"""
+        # SHAP is imported on first use to keep it off the app's startup path
+        import shap
+        
         try:
             # Use a sample of data as background for SHAP
             if len(self.data) > 100:
-                self.background_data = shap.sample(self.data, 100)
+                self.background_data = shap.sample(self._data_f32, 100)
             else:
-                self.background_data = self.data
+                self.background_data = self._data_f32
             
             # Try different SHAP explainers based on model type
             try:
@@ -47,8 +66,17 @@ class ExplainerManager:
                     # Try LinearExplainer for linear models
                     self.shap_explainer = shap.LinearExplainer(self.model, self.background_data)
                 except:
-                    # Fall back to KernelExplainer (slower but works for any model)
-                    self.shap_explainer = shap.KernelExplainer(self.model.predict, self.background_data)
+                    # Fall back to KernelExplainer (slower but works for any model).
+                    # Its cost grows with the background size, so summarize the
+                    # data into weighted k-means centroids instead of raw rows
+                    kernel_background = shap.kmeans(self._data_f32, min(KERNEL_BACKGROUND_CLUSTERS, len(self.data)))
+                    self.shap_explainer = shap.KernelExplainer(self._predict, kernel_background)
+            
+            # KernelExplainer is too slow to explain rows that were not asked for
+            self._precompute_shap = (
+                not isinstance(self.shap_explainer, shap.KernelExplainer)
+                and len(self.data) <= SHAP_PRECOMPUTE_MAX_ROWS
+            )
             
             st.success("SHAP explainer initialized successfully!")
             
@@ -58,11 +86,14 @@ class ExplainerManager:
     
     def _initialize_lime(self):
         """Initialize LIME explainer"""
+        # LIME is imported on first use to keep it off the app's startup path
+        import lime.lime_tabular
+        
         try:
             # Determine mode based on prediction output
             try:
-                sample_pred = self.model.predict(self.data.iloc[:1])
-                if hasattr(self.model, 'predict_proba'):
+                sample_pred = self._predict(self.data.iloc[:1])
+                if self._predict_proba is not None:
                     mode = 'classification'
                 else:
                     mode = 'regression'
@@ -71,7 +102,7 @@ class ExplainerManager:
             
             # Create LIME explainer
             self.lime_explainer = lime.lime_tabular.LimeTabularExplainer(
-                self.data.values,
+                self._data_f32,
                 feature_names=self.data.columns,
                 mode=mode,
                 discretize_continuous=True
@@ -89,21 +120,18 @@ class ExplainerManager:
             return None
         
         try:
-            # Calculate SHAP values for the dataset
-            shap_values = self.shap_explainer.shap_values(self.data)
+            # Calculate SHAP values for the dataset (also fills the per-row cache)
+            shap_values = self.explain_batch(np.arange(len(self.data)))
             
-            # Handle different output formats
-            if isinstance(shap_values, list):
-                # Multi-class classification - use first class
-                shap_values = shap_values[0]
-            
-            # Calculate mean absolute SHAP values for each feature
-            importance = np.abs(shap_values).mean(axis=0)
+            # Mean absolute SHAP value per feature over all rows and outputs
+            # (classes), in one reduction over the stacked array
+            importance = np.abs(shap_values).mean(axis=(0, 2))
+            order = np.argsort(-importance, kind='stable')
             
             return pd.DataFrame({
-                'feature': self.data.columns,
-                'importance': importance
-            }).sort_values('importance', ascending=False)
+                'feature': self.data.columns.to_numpy()[order],
+                'importance': importance[order]
+            }, index=order)
             
         except Exception as e:
             st.error(f"Error calculating SHAP global importance: {str(e)}")
@@ -115,44 +143,119 @@ class ExplainerManager:
             return None
         
         try:
-            # Get single instance
-            instance = self.data.iloc[instance_idx:instance_idx+1]
+            # Explain every row at once on the first request when that is cheap,
+            # so later instances are served from the cache
+            if self._precompute_shap and instance_idx not in self._shap_cache:
+                self.explain_batch(np.arange(len(self.data)))
             
-            # Calculate SHAP values
-            shap_values = self.shap_explainer.shap_values(instance)
+            # Reuse cached SHAP values when the row was already explained
+            shap_values = self.explain_batch([instance_idx])[0]
             
-            # Handle different output formats
-            if isinstance(shap_values, list):
-                shap_values = shap_values[0]
+            # For classifiers, explain the output of the predicted class
+            output_idx = 0
+            if shap_values.shape[1] > 1 and self._predict_proba is not None:
+                output_idx = self._predicted_class_idx(instance_idx)
             
             return {
-                'shap_values': shap_values[0],
+                'shap_values': shap_values[:, output_idx],
                 'feature_names': self.data.columns,
-                'instance_values': instance.values[0]
+                'instance_values': self.data.iloc[instance_idx].values
             }
             
         except Exception as e:
             st.error(f"Error calculating SHAP local explanation: {str(e)}")
             return None
     
-    def get_lime_local_explanation(self, instance_idx, num_features=10):
-        """Get local explanation for a specific instance using LIME"""
+    def explain_batch(self, indices):
+        """
+        Get SHAP values for several instances with a single explainer call
+        
+        Rows that were explained before are served from the cache; only the
+        missing rows are passed to the SHAP explainer, in one batch.
+        
+        Args:
+            indices: Sequence of row positions in the data
+            
+        Returns:
+            numpy array of shape (n_indices, n_features, n_outputs), where
+            n_outputs is the number of classes for multi-output models and 1
+            otherwise
+        """
+        indices = [int(i) for i in indices]
+        missing = [i for i in dict.fromkeys(indices) if i not in self._shap_cache]
+        
+        if missing:
+            shap_values = self.shap_explainer.shap_values(self._data_f32[missing])
+            
+            # Normalize the output formats to (rows, features, outputs): older
+            # SHAP returns a list with one array per class, newer SHAP a 3-D
+            # array, and single-output models a 2-D array
+            if isinstance(shap_values, list):
+                shap_values = np.stack(shap_values, axis=-1)
+            elif shap_values.ndim == 2:
+                shap_values = shap_values[:, :, np.newaxis]
+            
+            self._shap_cache.update(zip(missing, shap_values))
+        
+        return np.array([self._shap_cache[i] for i in indices])
+    
+    def _predicted_class_idx(self, instance_idx):
+        """Column of the predicted class in predict_proba's output for one row"""
+        return int(np.argmax(self._predict_proba(self._data_f32[[instance_idx]])[0]))
+    
+    def _lime_predict(self, X):
+        """
+        Predictor passed to LIME for each batch of perturbed samples
+        
+        The whole batch is cast once to a contiguous float32 array (the dtype
+        tree ensembles predict on). Classifiers return probabilities, which
+        LIME requires in classification mode.
+        
+        Args:
+            X: Array of perturbed samples
+            
+        Returns:
+            Class probabilities for classifiers, predictions otherwise
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if self.lime_explainer.mode == 'classification':
+            return self._predict_proba(X)
+        return self._predict(X)
+    
+    def get_lime_local_explanation(self, instance_idx, num_features=10, num_samples=1000):
+        """
+        Get local explanation for a specific instance using LIME
+        
+        Args:
+            instance_idx: Row position of the instance to explain
+            num_features: Maximum number of features in the explanation
+            num_samples: Number of perturbations LIME samples (LIME's own
+                default is 5000; 1000 is usually stable enough and much faster)
+        """
         if self.lime_explainer is None:
             return None
         
         try:
             # Get single instance
-            instance = self.data.iloc[instance_idx].values
+            instance = self._data_f32[instance_idx]
+            
+            # For classifiers, explain the predicted class (as local SHAP does)
+            # rather than LIME's default label 1; regression ignores the label
+            label = 1
+            if self.lime_explainer.mode == 'classification':
+                label = self._predicted_class_idx(instance_idx)
             
             # Generate LIME explanation
             explanation = self.lime_explainer.explain_instance(
                 instance,
-                self.model.predict,
-                num_features=num_features
+                self._lime_predict,
+                labels=(label,),
+                num_features=num_features,
+                num_samples=num_samples
             )
             
             # Extract feature importance
-            importance_dict = dict(explanation.as_list())
+            importance_dict = dict(explanation.as_list(label=label))
             
             return {
                 'feature_importance': importance_dict,
@@ -170,17 +273,20 @@ class ExplainerManager:
         if importance_df is None:
             return None
         
-        # Create bar plot
-        fig = px.bar(
-            importance_df.head(15),  # Show top 15 features
-            x='importance',
-            y='feature',
-            orientation='h',
-            title='Global Feature Importance (SHAP)',
-            labels={'importance': 'Mean |SHAP Value|', 'feature': 'Features'}
-        )
+        import plotly.graph_objects as go
+        
+        # Create bar plot from the top 15 features
+        top = importance_df.head(15)
+        fig = go.Figure(go.Bar(
+            x=top['importance'].to_numpy(),
+            y=top['feature'].to_numpy(),
+            orientation='h'
+        ))
         
         fig.update_layout(
+            title='Global Feature Importance (SHAP)',
+            xaxis_title='Mean |SHAP Value|',
+            yaxis_title='Features',
             height=500,
             yaxis={'categoryorder': 'total ascending'}
         )
@@ -192,51 +298,40 @@ class ExplainerManager:
         if explanation_data is None:
             return None
         
+        import plotly.graph_objects as go
+        
         try:
             if method == 'SHAP':
-                shap_values = explanation_data['shap_values']
-                feature_names = explanation_data['feature_names']
-                
-                # Create DataFrame for plotting
-                plot_df = pd.DataFrame({
-                    'feature': feature_names,
-                    'shap_value': shap_values
-                }).sort_values('shap_value', key=abs, ascending=False).head(15)
+                values = np.asarray(explanation_data['shap_values'], dtype=np.float64)
+                features = np.asarray(explanation_data['feature_names'])
+                value_label = 'SHAP Value'
                 
-                # Create bar plot
-                fig = px.bar(
-                    plot_df,
-                    x='shap_value',
-                    y='feature',
-                    orientation='h',
-                    title='Local Feature Explanation (SHAP)',
-                    labels={'shap_value': 'SHAP Value', 'feature': 'Features'},
-                    color='shap_value',
-                    color_continuous_scale='RdBu_r'
-                )
+                # Keep the 15 largest contributions
+                order = np.argsort(-np.abs(values), kind='stable')[:15]
+                values, features = values[order], features[order]
                 
             else:  # LIME
                 importance_dict = explanation_data['feature_importance']
-                
-                # Create DataFrame for plotting
-                plot_df = pd.DataFrame([
-                    {'feature': feature, 'importance': importance}
-                    for feature, importance in importance_dict.items()
-                ]).sort_values('importance', key=abs, ascending=False)
-                
-                # Create bar plot
-                fig = px.bar(
-                    plot_df,
-                    x='importance',
-                    y='feature',
-                    orientation='h',
-                    title='Local Feature Explanation (LIME)',
-                    labels={'importance': 'LIME Importance', 'feature': 'Features'},
-                    color='importance',
-                    color_continuous_scale='RdBu_r'
-                )
+                values = np.fromiter(importance_dict.values(), dtype=np.float64, count=len(importance_dict))
+                features = np.array(list(importance_dict.keys()), dtype=object)
+                value_label = 'LIME Importance'
+            
+            # Create bar plot colored by contribution
+            fig = go.Figure(go.Bar(
+                x=values,
+                y=features,
+                orientation='h',
+                marker={
+                    'color': values,
+                    'colorscale': 'RdBu_r',
+                    'colorbar': {'title': {'text': value_label}}
+                }
+            ))
             
             fig.update_layout(
+                title=f'Local Feature Explanation ({method})',
+                xaxis_title=value_label,
+                yaxis_title='Features',
                 height=500,
                 yaxis={'categoryorder': 'total ascending'}
             )
@@ -245,4 +340,4 @@ class ExplainerManager:
             
         except Exception as e:
             st.error(f"Error creating explanation plot: {str(e)}")
-            return None
\ No newline at end of file
+            return None
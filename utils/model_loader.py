@@ -3,6 +3,69 @@ import pickle
 import streamlit as st
 from sklearn.base import BaseEstimator
 import pandas as pd
+import numpy as np
+import json
+from io import BytesIO
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+# Bounded so replaced uploads do not keep stale estimators in memory
+@st.cache_resource(show_spinner=False, max_entries=8, ttl=3600)
+def _deserialize_model(model_bytes, file_extension):
+    """Deserialize a pickle/joblib model, cached on content so reruns and re-uploads skip unpickling"""
+    if file_extension in ['pkl', 'pickle']:
+        return pickle.loads(model_bytes)
+    return joblib.load(BytesIO(model_bytes))
+
+class OnnxModel:
+    """Adapter exposing an ONNX Runtime session through the scikit-learn predict API"""
+    
+    def __init__(self, session):
+        """
+        Wrap an inference session
+        
+        Args:
+            session: onnxruntime.InferenceSession for a model with one float input
+        """
+        self.session = session
+        model_input = session.get_inputs()[0]
+        self.input_name = model_input.name
+        if isinstance(model_input.shape[1], int):
+            self.n_features_in_ = model_input.shape[1]
+    
+    def _run(self, X):
+        """Run the session on X cast to float32 and return all outputs"""
+        X = np.asarray(X, dtype=np.float32)
+        return self.session.run(None, {self.input_name: X})
+    
+    def predict(self, X):
+        """Predict labels or values for X"""
+        return self._run(X)[0].ravel()
+
+class OnnxClassifier(OnnxModel):
+    """ONNX adapter for classifiers with a probability tensor or ZipMap output"""
+    
+    def __init__(self, session, classes=None):
+        super().__init__(session)
+        # skl2onnx's default export wraps the probabilities in a ZipMap: one
+        # {class: probability} dict per row instead of an (n, k) tensor
+        self.zipmap = session.get_outputs()[1].type.startswith('seq(map(')
+        if classes is None and self.zipmap and hasattr(self, 'n_features_in_'):
+            # The ZipMap keys are the class labels, in probability column order
+            probe = self._run(np.zeros((1, self.n_features_in_)))[1]
+            classes = list(probe[0].keys())
+        if classes is not None:
+            self.classes_ = np.asarray(classes)
+    
+    def predict_proba(self, X):
+        """Predict class probabilities for X"""
+        proba = self._run(X)[1]
+        if self.zipmap:
+            return np.array([list(row.values()) for row in proba], dtype=np.float64)
+        return proba
 
 class ModelLoader:
     """Utility class for loading ML models"""
@@ -22,14 +85,13 @@ class ModelLoader:
             # Get file extension
             file_extension = uploaded_file.name.split('.')[-1].lower()
             
-            if file_extension in ['pkl', 'pickle']:
-                # Load pickle file
-                model = pickle.load(uploaded_file)
-            elif file_extension in ['joblib', 'jl']:
-                # Load joblib file
-                model = joblib.load(uploaded_file)
+            if file_extension == 'onnx':
+                return ModelLoader.load_onnx_model(uploaded_file.getvalue())
+            elif file_extension in ['pkl', 'pickle', 'joblib', 'jl']:
+                # Load pickle/joblib file (cached on the uploaded bytes)
+                model = _deserialize_model(uploaded_file.getvalue(), file_extension)
             else:
-                st.error(f"Unsupported file format: {file_extension}. Please use .pkl, .pickle, .joblib, or .jl files.")
+                st.error(f"Unsupported file format: {file_extension}. Please use .pkl, .pickle, .joblib, .jl, or .onnx files.")
                 return None
             
             # Validate that it's a sklearn-like model
@@ -43,6 +105,56 @@ class ModelLoader:
             st.error(f"Error loading model: {str(e)}")
             return None
     
+    @staticmethod
+    def load_onnx_model(model_bytes):
+        """
+        Load an ONNX model into an ONNX Runtime session
+        
+        Classifiers may output a probability tensor (skl2onnx's zipmap=False
+        option) or skl2onnx's default ZipMap. Class labels are read from the
+        'classes' metadata entry written by create_sample_data.py when
+        present, otherwise from the ZipMap keys.
+        
+        Args:
+            model_bytes: Serialized ONNX model
+            
+        Returns:
+            OnnxModel or OnnxClassifier adapter, or None if failed
+        """
+        if ort is None:
+            st.error("Loading .onnx models requires the onnxruntime package.")
+            return None
+        
+        session = ort.InferenceSession(model_bytes, providers=['CPUExecutionProvider'])
+        
+        if len(session.get_outputs()) > 1:
+            classes = session.get_modelmeta().custom_metadata_map.get('classes')
+            model = OnnxClassifier(session, json.loads(classes) if classes else None)
+            if model.zipmap and not hasattr(model, 'classes_'):
+                st.error("Could not read the class labels of this ONNX classifier. Please re-export it with skl2onnx's zipmap=False option.")
+                return None
+            return model
+        
+        return OnnxModel(session)
+    
+    @staticmethod
+    def get_model_capabilities(model):
+        """
+        Detect the prediction capabilities of a model once, at load time
+        
+        Args:
+            model: Loaded ML model
+            
+        Returns:
+            Dictionary with 'proba' (has predict_proba) and 'n_classes'
+            (number of known class labels, 0 if the model exposes none)
+        """
+        classes = getattr(model, 'classes_', None)
+        return {
+            'proba': hasattr(model, 'predict_proba'),
+            'n_classes': len(classes) if classes is not None else 0
+        }
+    
     @staticmethod
     def get_model_info(model):
         """